@@ -1,26 +1,53 @@
 #!/usr/bin/env python3
 
 # Standard libraries
-import codecs
 import collections
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import copy
 import datetime
-from glob import glob
+from functools import lru_cache, partial
+import html
 import io
 import logging
+import multiprocessing
 import os
 import re
-from shutil import copyfile
+from shutil import copyfile, copyfileobj
 import sys
 
-# Parsing and serializing
-from html5lib import parseFragment as html5lib_parse, serialize as html5lib_serialize
-from urllib.parse import urlparse, urljoin
-from markdownify import markdownify
-import toml
+# Parsing and serializing (html5lib, markdownify and toml are only imported
+# when needed)
+import urllib.parse
+from urllib.parse import urljoin
 from urllib3 import PoolManager
-from xml.etree.ElementTree import ElementTree, TreeBuilder, XMLParser, ParseError
+from xml.etree.ElementTree import ParseError
 import yaml
 
+# Prefer libxml2 (via lxml, if installed) for parsing the WPXR file, and
+# allow it as an alternative to html5lib for parsing content
+try:
+    from lxml.etree import iterparse, tostring as lxml_tostring
+    import lxml.html as lxml_html
+
+    # libxml2 refuses text (and CDATA) over 10 MiB, such as inline images,
+    # unless huge_tree is set; ElementTree has no such limit
+    WPXR_ITERPARSE_OPTIONS = {"huge_tree": True}
+except ImportError:
+    from xml.etree.ElementTree import iterparse
+
+    lxml_html = None
+    WPXR_ITERPARSE_OPTIONS = {}
+
+# Prefer the libyaml (C) loader and dumper when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as _SafeDumper, CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeDumper as _SafeDumper, SafeLoader as _SafeLoader
+
+# urlparse results are immutable, and the same URLs (not least the site's own)
+# are parsed over and over during conversion
+urlparse = lru_cache(maxsize=4096)(urllib.parse.urlparse)
+
 """
 wpxr-to-static - Wordpress XML exports to static website generator files
 
@@ -47,7 +74,26 @@ Tested with Python 3.9.4 (Windows) and 3.8.6 (Ubuntu Linux)
 """
 
 
+# Parsed config files keyed on (absolute path, mtime, size); least recently
+# used first
+_CONFIG_CACHE = collections.OrderedDict()
+_CONFIG_CACHE_MAX = 64
+
+# Config lists which are only used for membership tests
+CONFIG_SET_KEYS = ("item_type_filter", "final_remove_fields")
+
+
+# Converted to frozensets once, so lookups don't scan a list for every item
+def config_lists_to_sets(config):
+    if isinstance(config, dict):
+        for key in CONFIG_SET_KEYS:
+            if isinstance(config.get(key), list):
+                config[key] = frozenset(config[key])
+    return config
+
+
 class W2SConfig:
+    __slots__ = ("config", "merged_config", "data_model")
 
     BASE_CONFIG_YAML = """
 # Logging level (just stderr output at the moment)
@@ -66,6 +112,10 @@ content_dir: content
 # Download image files from content bodies
 download_content_images: false
 
+# Parser used when rewriting image and link URLs in content:
+# html5lib, or lxml (faster, but requires lxml to be installed)
+content_html_parser: html5lib
+
 # Relative path to your WordPress images
 # e.g. /wp-content/uploads would create a match for
 # an image in you WPXR with a URL such as
@@ -158,6 +208,9 @@ keep_page_hierarchy: True
 data_models: hugo_data_model.yaml
 """
 
+    # Parsed once, when the class is defined; shared (read-only) by instances
+    BASE_CONFIG = config_lists_to_sets(yaml.load(BASE_CONFIG_YAML, Loader=_SafeLoader))
+
     CONFIG_BASE = "base"
     CONFIG_MAIN = "main"
     CONFIG_DATA_MODEL = "data_model"
@@ -165,12 +218,18 @@ data_models: hugo_data_model.yaml
     def __init__(self, config_file_name):
         self.config = {}
 
-        base_config_file = io.StringIO(W2SConfig.BASE_CONFIG_YAML)
-        self.config[W2SConfig.CONFIG_BASE] = yaml.safe_load(base_config_file)
-        base_config_file.close()
+        self.config[W2SConfig.CONFIG_BASE] = W2SConfig.BASE_CONFIG
 
         self.read_config_file(W2SConfig.CONFIG_MAIN, config_file_name)
 
+        # Base config overridden by any (non-empty) main config items, merged
+        # once here rather than on every get_config_item
+        self.merged_config = dict(self.config[W2SConfig.CONFIG_BASE])
+        if self.config[W2SConfig.CONFIG_MAIN] is not None:
+            for key, value in self.config[W2SConfig.CONFIG_MAIN].items():
+                if value is not None:
+                    self.merged_config[key] = value
+
         if self.get_config_item("data_models") is not None:
             self.read_config_file(
                 W2SConfig.CONFIG_DATA_MODEL, self.get_config_item("data_models")
@@ -185,6 +244,8 @@ data_models: hugo_data_model.yaml
                 W2SConfig.CONFIG_MAIN
             ]
 
+        self.data_model = self.config[W2SConfig.CONFIG_DATA_MODEL]
+
     # Configuration
     def read_config_file(self, config_section, config_name):
         config = None
@@ -195,37 +256,42 @@ data_models: hugo_data_model.yaml
         ]:
             raise ValueError("Invalid config_section " + str(config_section) + " given")
 
-        config_file = io.open(config_name, "r", encoding="utf-8")
-        if os.path.splitext(config_name)[1] == ".yaml":
-            config = yaml.safe_load(config_file)
-        elif os.path.splitext(config_name)[1] == ".toml":
-            config = toml.load(config_file)
-        config_file.close()
-        self.config[config_section] = config
+        config_stat = os.stat(config_name)
+        cache_key = (
+            os.path.abspath(config_name),
+            config_stat.st_mtime_ns,
+            config_stat.st_size,
+        )
+        if cache_key in _CONFIG_CACHE:
+            _CONFIG_CACHE.move_to_end(cache_key)
+            config = _CONFIG_CACHE[cache_key]
+        else:
+            config_file = io.open(config_name, "r", encoding="utf-8")
+            if os.path.splitext(config_name)[1] == ".yaml":
+                config = yaml.load(config_file, Loader=_SafeLoader)
+            elif os.path.splitext(config_name)[1] == ".toml":
+                import toml
+
+                config = toml.load(config_file)
+            config_file.close()
+            _CONFIG_CACHE[cache_key] = config
+            if len(_CONFIG_CACHE) > _CONFIG_CACHE_MAX:
+                _CONFIG_CACHE.popitem(last=False)
+
+        # Callers get their own copy so the cached tree is never modified
+        self.config[config_section] = config_lists_to_sets(copy.deepcopy(config))
 
     def get_config_item(self, key):
-        value = None
-        if self.config[W2SConfig.CONFIG_MAIN] is not None:
-            value = self.config[W2SConfig.CONFIG_MAIN].get(key)
-        if value is None:
-            value = self.config[W2SConfig.CONFIG_BASE].get(key)
-        return value
+        return self.merged_config.get(key)
 
     def get_data_model_item(self, key):
-        value = self.config[W2SConfig.CONFIG_DATA_MODEL].get(key)
-        return value
+        return self.data_model.get(key)
 
 
 class WPXR:
-    # Create namespace map from xml
-    class ns_tree_builder(TreeBuilder):
-        def __init__(self):
-            TreeBuilder.__init__(self)
-            self.namespaces = {}
+    __slots__ = ("ns", "wpxr_tree")
 
-        def start_ns(self, prefix, uri):
-            if prefix != "":
-                self.namespaces[prefix] = uri
+    READ_BUFFER_SIZE = 128 * 1024
 
     def __init__(self, wpxr_file):
         self.ns = {}
@@ -234,17 +300,24 @@ class WPXR:
 
     # Parse a WordPress XML file into an ElementTree
     def parse_wpxr(self, wpxr_file):
-        tree_builder = self.ns_tree_builder()
-        parser = XMLParser(target=tree_builder)
-        tree = ElementTree()
         logging.info("Reading: " + wpxr_file)
-        root = tree.parse(wpxr_file, parser=parser)
-
-        # Namespace map
-        self.ns = tree_builder.namespaces
+        # Large reads mean fewer syscalls while feeding the parser
+        with io.open(wpxr_file, "rb", buffering=WPXR.READ_BUFFER_SIZE) as wpxr_stream:
+            # Create namespace map from the parser's start-ns events, while
+            # leaving building the tree itself to the (C) default TreeBuilder.
+            # Only namespace declarations come back to Python; the root
+            # element is available once the whole file has been parsed.
+            wpxr_parser = iterparse(
+                wpxr_stream, events=("start-ns",), **WPXR_ITERPARSE_OPTIONS
+            )
+            for event, (prefix, uri) in wpxr_parser:
+                # Default namespace prefix is "" (ElementTree) or None (lxml)
+                if prefix:
+                    self.ns[prefix] = uri
+            root = wpxr_parser.root
 
         self.wpxr_tree = root.find("channel")
-        if self.wpxr_tree:
+        if self.wpxr_tree is not None:
             logging.info("Found 'channel' in " + wpxr_file)
         else:
             raise ParseError("Missing channel")
@@ -256,45 +329,139 @@ class WPXR:
         return self.ns
 
 
+# A single namespaced tag (e.g. wp:post_id) which can be resolved to {uri}tag
+NS_TAG_RE = re.compile(r"([A-Za-z_][\w.-]*):([A-Za-z_][\w.-]*)")
+
+
+# Parsed YAML/TOML maps are always dicts, and the isinstance check for a plain
+# dict is much cheaper than the abstract Mapping check, so try it first
+def is_map(value):
+    return isinstance(value, dict) or isinstance(value, collections.abc.Mapping)
+
+
+# Whether value is one of a field's (hashable, unhashable) values to remove;
+# values that can't be hashed (e.g. lists or maps) can't be in the set
+def is_remove_field_value(value, remove_values):
+    hashable_values, unhashable_values = remove_values
+    try:
+        return value in hashable_values
+    except TypeError:
+        return value in unhashable_values
+
+
+# Content without any of these can't need its image URLs or hrefs rewritten
+FIGURE_TAG_RE = re.compile(r"<figure\b", re.IGNORECASE)
+# (HTML allows '/' as well as whitespace between a tag name and attributes)
+ANCHOR_TAG_RE = re.compile(r"<a[\s/]", re.IGNORECASE)
+
+# An <a> tag up to (and including) the opening quote, if any, of its href
+ANCHOR_HREF_START_PATTERN = (
+    r"((?i:<a[\s/](?:[^>\"']|\"[^\"]*\"|'[^']*')*?(?<=[\s/])href)\s*=\s*([\"']?))\s*"
+)
+
+# A relative path which urljoin would append to a base path unchanged (no
+# '.' or '..' segments, empty segments, params, query or fragment)
+PLAIN_REL_PATH_RE = re.compile(
+    r"(?!\.\.?(?:/|$))[\w.~%+=&,@!$'()*-]+(?:/(?!\.\.?(?:/|$))[\w.~%+=&,@!$'()*-]+)*"
+)
+
+# WP GMT dates (e.g. wp:post_date_gmt)
+WP_GMT_DATE_RE = re.compile(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d")
+WP_GMT_DATE_FORMAT = "%Y-%m-%d %H:%M:%S%z"
+
+# A backreference in a regexp (by number, or by name)
+BACKREFERENCE_RE = re.compile(r"\\[1-9]|\(\?P=")
+
+# Used to turn the site URL into the name of its build directory
+URL_SCHEME_RE = re.compile(r"^https?")
+NAME_SANITIZE_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+# Field values are nearly always str already, and str() of a str isn't free
+def as_str(value):
+    return value if isinstance(value, str) else str(value)
+
+
+# What int() requires a string to start with
+INT_PREFIX_RE = re.compile(r"\s*[-+]?\d")
+
+
 def unstring_int(value):
     result = value
-    try:
-        intresult = int(value)
-    except ValueError as e:
-        if not str(e).startswith("invalid literal for " + "int() with base 10:"):
-            raise ValueError(e)
-    else:
-        result = intresult
+    # Most values (titles, URLs, content) can't be integers, so avoid
+    # the far more costly failed int() and exception for those
+    if INT_PREFIX_RE.match(value) is not None:
+        try:
+            result = int(value)
+        except ValueError:
+            pass
 
     return result
 
 
+# Location in the tree being converted, for log messages; only joined into a
+# string if a message using it is actually emitted
+class TreeContext:
+    __slots__ = ("parent", "parts")
+
+    def __init__(self, parent, *parts):
+        self.parent = parent
+        self.parts = parts
+
+    def __str__(self):
+        # Walk up to the root context and join everything once, rather than
+        # building an intermediate string at every level
+        chain = []
+        context = self
+        while isinstance(context, TreeContext):
+            chain.append(context.parts)
+            context = context.parent
+        pieces = [str(context)]
+        for parts in reversed(chain):
+            pieces.extend(str(part) for part in parts)
+        return "".join(pieces)
+
+
 class TreeConverter:
+    __slots__ = (
+        "element_tree",
+        "ns",
+        "out_tree",
+        "path_cache",
+        "valid_data_models",
+        "modifier_map",
+    )
+
     def __init__(self, element_tree, ns, modifier_map):
         self.element_tree = element_tree
         self.ns = ns
         self.out_tree = []
-        self.contains_dispatch_map = {
-            "attr": self.find_item_use_attrs_from_data_model,
-            "item": self.find_item_apply_data_model,
-            "list": self.find_list_apply_data_model,
-        }
-
-        self.modifier_map = {
-            "key-value": self.map_to_key_value,
-            "list-up-map": self.list_up_map,
-            "pull-single": self.pull_single_from_list,
-            "remove-list": self.remove_list,
-            "remove-zero": self.remove_zero,
-            "to-lower": self.to_lower,
-        }
+        self.path_cache = {}
+        self.valid_data_models = set()
 
-        # Merge modifier maps from instantation
-        if (modifier_map is not None) and isinstance(
-            modifier_map, collections.abc.Mapping
-        ):
+        # Modifiers from instantiation (the built-in ones are in
+        # TreeConverter.MODIFIER_MAP)
+        self.modifier_map = {}
+        if (modifier_map is not None) and is_map(modifier_map):
             for mod_key, mod_name in modifier_map.items():
-                self.modifier_map[mod_key] = modifier_map[mod_key]
+                # Checked once here, so dispatch doesn't need to
+                if not callable(mod_name):
+                    raise TypeError(
+                        "Modifier " + str(mod_key) + " is not a callable function"
+                    )
+                self.modifier_map[mod_key] = mod_name
+
+    # Resolve 'prefix:tag' paths to '{uri}tag' once, so ElementTree doesn't
+    # need to apply the namespace map on every find
+    def resolve_path(self, path):
+        resolved = self.path_cache.get(path)
+        if resolved is None:
+            resolved = path
+            ns_tag = NS_TAG_RE.fullmatch(path)
+            if (ns_tag is not None) and (self.ns.get(ns_tag.group(1)) is not None):
+                resolved = "{" + self.ns[ns_tag.group(1)] + "}" + ns_tag.group(2)
+            self.path_cache[path] = resolved
+        return resolved
 
     def pull_single_from_list(
         self, multi_list, result_tree, data_model, item_name, context
@@ -304,29 +471,25 @@ class TreeConverter:
 
         singles = data_model.get("singles")
 
-        if (singles is not None) and isinstance(singles, list):
-            if multi_list is not None:
-                for single in singles:
-                    if (single is not None) and isinstance(
-                        single, collections.abc.Mapping
-                    ):
-                        for single_key, single_index in single.items():
-                            if (multi_list.get(single_key) is not None) and isinstance(
-                                multi_list[single_key], list
-                            ):
-                                if single_index > len(multi_list[single_key]) - 1:
-                                    logging.error(
-                                        "Index "
-                                        + str(single_index)
-                                        + " not in list at "
-                                        + str(context)
-                                    )
-                                    item = None
-                                else:
-                                    item = multi_list[single_key][single_index]
+        if (singles is None) or (not isinstance(singles, list)) or (multi_list is None):
+            singles = []
+
+        for single in singles:
+            if (single is None) or (not is_map(single)):
+                continue
+            for single_key, single_index in single.items():
+                # Look the list up once, rather than for each test and access
+                single_list = multi_list.get(single_key)
+                if (single_list is None) or (not isinstance(single_list, list)):
+                    continue
+                if single_index > len(single_list) - 1:
+                    logging.error("Index %s not in list at %s", single_index, context)
+                    item = None
+                else:
+                    item = single_list[single_index]
 
         if item is not None:
-            if isinstance(item, collections.abc.Mapping):
+            if is_map(item):
                 for item_key, item_value in item.items():
                     # Only add, don't overwrite
                     if out_tree.get(item_key) is None:
@@ -351,8 +514,8 @@ class TreeConverter:
 
     def list_up_map(self, cur_map, result_tree, data_model, item_name, context):
         out_map = result_tree
-        if isinstance(out_map, collections.abc.Mapping):
-            if isinstance(cur_map, collections.abc.Mapping):
+        if is_map(out_map):
+            if is_map(cur_map):
                 for item_key, item_value in cur_map.items():
                     if out_map.get(item_key) is None:
                         out_map[item_key] = [item_value]
@@ -367,10 +530,8 @@ class TreeConverter:
         keys_to_delist = data_model.get("remove_list_keys")
         if (keys_to_delist is not None) and isinstance(keys_to_delist, list):
 
-            if (out_map is None) or (not isinstance(out_map, collections.abc.Mapping)):
-                logging.error(
-                    "result_tree is not a map for remove_list at " + str(context)
-                )
+            if (out_map is None) or (not is_map(out_map)):
+                logging.error("result_tree is not a map for remove_list at %s", context)
                 return cur_map
 
             for delist_key in keys_to_delist:
@@ -397,24 +558,28 @@ class TreeConverter:
     def apply_one_modifier_to_item(
         self, item, result_tree, modifier, mod_apply, data_model, item_name, context
     ):
+        if (mod_apply is not True) or (modifier is None) or (item is None):
+            return item
 
         result = item
 
-        if mod_apply is True:
-            if modifier is not None:
-                modifier_function = self.modifier_map.get(modifier)
-                if (modifier_function is not None) and callable(modifier_function):
-                    logging.debug(
-                        "Applying modifier " + str(modifier) + " at " + str(context)
-                    )
-                    if result is not None:
-                        result = modifier_function(
-                            result,
-                            result_tree,
-                            data_model,
-                            item_name,
-                            str(context) + " once",
-                        )
+        # Modifiers from instantiation take precedence over built-ins,
+        # which are plain functions needing the converter passed in
+        modifier_function = self.modifier_map.get(modifier)
+        modifier_self = ()
+        if modifier_function is None:
+            modifier_function = TreeConverter.MODIFIER_MAP.get(modifier)
+            modifier_self = (self,)
+        if modifier_function is not None:
+            logging.debug("Applying modifier %s at %s", modifier, context)
+            result = modifier_function(
+                *modifier_self,
+                result,
+                result_tree,
+                data_model,
+                item_name,
+                TreeContext(context, " once"),
+            )
 
         return result
 
@@ -435,7 +600,7 @@ class TreeConverter:
                             True,
                             data_model,
                             item_name,
-                            str(context) + ": " + mod_list_item,
+                            TreeContext(context, ": ", mod_list_item),
                         )
             elif mod_apply is True:
                 result = self.apply_one_modifier_to_item(
@@ -445,7 +610,7 @@ class TreeConverter:
                     mod_apply,
                     data_model,
                     item_name,
-                    str(context) + ": " + modifier,
+                    TreeContext(context, ": ", modifier),
                 )
 
         return result
@@ -453,20 +618,23 @@ class TreeConverter:
     def apply_modifiers_to_item(
         self, item, result_tree, modifiers, data_model, item_name, context
     ):
+        # Most elements have no modifiers at all
+        if not modifiers:
+            return item
+
         result = item
 
-        if modifiers is not None:
-            if isinstance(modifiers, collections.abc.Mapping):
-                for modifier, mod_apply in modifiers.items():
-                    result = self.apply_modifier_map_to_item(
-                        result,
-                        result_tree,
-                        modifier,
-                        mod_apply,
-                        data_model,
-                        item_name,
-                        str(context) + ": apply(modifier)",
-                    )
+        if is_map(modifiers):
+            for modifier, mod_apply in modifiers.items():
+                result = self.apply_modifier_map_to_item(
+                    result,
+                    result_tree,
+                    modifier,
+                    mod_apply,
+                    data_model,
+                    item_name,
+                    TreeContext(context, ": apply(modifier)"),
+                )
 
         return result
 
@@ -494,10 +662,12 @@ class TreeConverter:
                             dispatch_modifiers,
                             dispatch_contained,
                             dispatch_value,
-                            str(context)
-                            + " for item # "
-                            + str(item_num)
-                            + " in result list apply modifiers",
+                            TreeContext(
+                                context,
+                                " for item # ",
+                                item_num,
+                                " in result list apply modifiers",
+                            ),
                         )
                         if cur_res is not None:
                             if result_list is not None:
@@ -513,7 +683,7 @@ class TreeConverter:
                             dispatch_modifiers,
                             dispatch_contained,
                             dispatch_value,
-                            str(context) + " for item in result apply modifiers",
+                            TreeContext(context, " for item in result apply modifiers"),
                         )
 
         return result
@@ -537,13 +707,12 @@ class TreeConverter:
 
         for contains_type, contains_value in contains_item.items():
             if (contains_type is None) or (contains_value is None):
-                logging.error("'contains' has an invalid entry at " + str(context))
+                logging.error("'contains' has an invalid entry at %s", context)
                 return
 
-            if (self.contains_dispatch_map.get(contains_type) is not None) and callable(
-                self.contains_dispatch_map[contains_type]
-            ):
-                dispatch_function = self.contains_dispatch_map[contains_type]
+            contains_function = TreeConverter.CONTAINS_DISPATCH_MAP.get(contains_type)
+            if contains_function is not None:
+                dispatch_function = contains_function
                 if (contained is not None) and (
                     contained.get(contains_value) is not None
                 ):
@@ -555,31 +724,21 @@ class TreeConverter:
 
         if (dispatch_function is None) or (dispatch_contained is None):
             logging.critical(
-                "'contains' does not have a valid dispatch value in " + str(context),
+                "'contains' does not have a valid dispatch value in %s",
+                context,
                 exc_info=True,
             )
             return
 
-        logging.debug(
-            "Applying "
-            + str(dispatch_type)
-            + " to "
-            + str(dispatch_value)
-            + " at "
-            + str(context),
-        )
+        logging.debug("Applying %s to %s at %s", dispatch_type, dispatch_value, context)
 
         result = dispatch_function(
+            self,
             element,
             dispatch_contained,
             modifier,
             result_tree,
-            str(context)
-            + " dispatch("
-            + str(dispatch_type)
-            + ":"
-            + str(dispatch_value)
-            + ")",
+            TreeContext(context, " dispatch(", dispatch_type, ":", dispatch_value, ")"),
         )
 
         if result is not None:
@@ -589,7 +748,7 @@ class TreeConverter:
                 result_tree,
                 dispatch_contained,
                 dispatch_value,
-                str(context) + " apply_modifiers",
+                TreeContext(context, " apply_modifiers"),
             )
 
         if result is not None:
@@ -598,57 +757,62 @@ class TreeConverter:
                     new_map = {}
                 new_map[dispatch_value] = result
             else:
-                logging.debug(
-                    "Adding " + str(dispatch_value) + " at " + str(context),
-                )
+                logging.debug("Adding %s at %s", dispatch_value, context)
                 result_tree[dispatch_value] = result
 
         if new_map is not None:
             result_tree.append(new_map)
 
-    def apply_contains_to_element_for_result_tree(
-        self, element, data_model, modifier, result_tree, context
-    ):
-        if (data_model is not None) and isinstance(data_model, collections.abc.Mapping):
-            if data_model.get("contains") is not None:
-                if not isinstance(data_model["contains"], list):
-                    logging.critical(
-                        "'contains' is not a list in data "
-                        + "model for an element in "
-                        + str(context),
-                        exc_info=True,
-                    )
-                    return
+    # Check the structure of a data model map which 'contains' elements
+    def validate_contains_data_model(self, data_model, context):
+        if data_model.get("contains") is not None:
+            if not isinstance(data_model["contains"], list):
+                logging.critical(
+                    "'contains' is not a list in data model for an element in %s",
+                    context,
+                    exc_info=True,
+                )
+                return False
 
-                if (data_model.get("contained") is None) or (
-                    not isinstance(data_model["contained"], collections.abc.Mapping)
-                ):
-                    logging.critical(
-                        "'contained' is not a map "
-                        + "in data model for an element in "
-                        + str(context),
-                        exc_info=True,
-                    )
-                    return
-            else:
+            if (data_model.get("contained") is None) or (
+                not is_map(data_model["contained"])
+            ):
                 logging.critical(
-                    "'data_model' is not a map which includes 'contains' in "
-                    + str(context),
+                    "'contained' is not a map in data model for an element in %s",
+                    context,
                     exc_info=True,
                 )
-                return
+                return False
+        else:
+            logging.critical(
+                "'data_model' is not a map which includes 'contains' in %s",
+                context,
+                exc_info=True,
+            )
+            return False
 
-            contains = data_model["contains"]
-            contained = data_model["contained"]
+        for contains_item in data_model["contains"]:
+            if (contains_item is None) or (not is_map(contains_item)):
+                logging.critical("'contains' has a non-map item in %s", context)
+                return False
 
-            for contains_item in contains:
-                if (contains_item is None) or (
-                    not isinstance(contains_item, collections.abc.Mapping)
-                ):
-                    logging.critical("'contains' has a non-map item in " + str(context))
+        return True
+
+    def apply_contains_to_element_for_result_tree(
+        self, element, data_model, modifier, result_tree, context
+    ):
+        if (data_model is not None) and is_map(data_model):
+            # The data model doesn't change during conversion, so each map in
+            # it only needs to be validated the first time it is used
+            if id(data_model) not in self.valid_data_models:
+                if not self.validate_contains_data_model(data_model, context):
                     return
+                self.valid_data_models.add(id(data_model))
+
+            contained = data_model["contained"]
 
-                logging.debug("Applying contains at " + str(context))
+            for contains_item in data_model["contains"]:
+                logging.debug("Applying contains at %s", context)
 
                 result = self.apply_contains_map_to_element(
                     element,
@@ -657,12 +821,13 @@ class TreeConverter:
                     data_model,
                     modifier,
                     result_tree,
-                    str(context) + ": contains",
+                    TreeContext(context, ": contains"),
                 )
 
                 if result is not None:
                     logging.critical(
-                        "Unexpected result applying contains at " + str(context),
+                        "Unexpected result applying contains at %s",
+                        context,
                         exc_info=True,
                     )
                     return
@@ -672,7 +837,7 @@ class TreeConverter:
                 data_model,
                 modifier,
                 result_tree,
-                str(context) + " model_to_element",
+                TreeContext(context, " model_to_element"),
             )
 
     def apply_data_model_to_element(
@@ -685,13 +850,11 @@ class TreeConverter:
 
         if (
             (data_model is not None)
-            and isinstance(data_model, collections.abc.Mapping)
+            and is_map(data_model)
             and (data_model.get("contains") is not None)
         ):
 
-            if (result_tree is None) or (
-                not isinstance(result_tree, collections.abc.Mapping)
-            ):
+            if (result_tree is None) or (not is_map(result_tree)):
                 result_tree = {}
 
             self.apply_contains_to_element_for_result_tree(
@@ -699,22 +862,23 @@ class TreeConverter:
                 data_model,
                 modifier,
                 result_tree,
-                str(context) + " map_contains",
+                TreeContext(context, " map_contains"),
             )
             result = result_tree
         else:
-            result = element.text
+            # lxml gives "" rather than None for an empty CDATA section
+            result = element.text or None
             if result is not None:
                 result = unstring_int(result)
 
-            logging.debug("Got value for " + str(context))
-            if (modifier is not None) and isinstance(modifier, collections.abc.Mapping):
+            logging.debug("Got value for %s", context)
+            if (modifier is not None) and is_map(modifier):
                 result = self.apply_modifiers_to_result(
                     result,
                     modifier,
                     result_tree,
                     data_model,
-                    str(context) + " element modifiers",
+                    TreeContext(context, " element modifiers"),
                 )
 
         return result
@@ -729,24 +893,22 @@ class TreeConverter:
             out_list = result_tree
 
         if data_model is None:
-            logging.critical(
-                "Missing data_model in '" + str(context) + "'", exc_info=True
-            )
+            logging.critical("Missing data_model in '%s'", context, exc_info=True)
             return result
 
         if (element_list is None) or (not isinstance(element_list, list)):
             logging.error(
-                "Attempted to use _to_list data_model on non-list at " + str(context)
+                "Attempted to use _to_list data_model on non-list at %s", context
             )
             return result
 
-        for item in element_list:
+        for item_index, item in enumerate(element_list):
             result = self.apply_data_model_to_element(
                 item,
                 data_model,
                 modifier,
                 None,
-                str(context) + " #" + str(element_list.index(item)),
+                TreeContext(context, " #", item_index),
             )
             if result is not None:
                 out_list.append(result)
@@ -759,14 +921,14 @@ class TreeConverter:
         result = None
 
         if data_model is not None:
-            if isinstance(data_model, collections.abc.Mapping):
+            if is_map(data_model):
                 result = {}
                 self.for_map_apply_data_model(
                     element_tree,
                     data_model,
                     modifier,
                     result,
-                    str(context) + " use_attrs",
+                    TreeContext(context, " use_attrs"),
                 )
 
             else:
@@ -783,34 +945,31 @@ class TreeConverter:
         result = None
 
         if data_model is not None:
-            if isinstance(data_model, collections.abc.Mapping):
+            if is_map(data_model):
                 result = {}
                 self.for_map_apply_data_model(
                     element_tree,
                     data_model,
                     modifier,
                     result,
-                    str(context) + " item_apply_map",
+                    TreeContext(context, " item_apply_map"),
                 )
 
             else:
-                element = element_tree.find(data_model, self.ns)
+                element = element_tree.find(self.resolve_path(data_model), self.ns)
                 if element is not None:
-                    context = context + ": " + data_model
+                    context = TreeContext(context, ": ", data_model)
                     result = self.apply_data_model_to_element(
                         element,
                         data_model,
                         modifier,
                         result_tree,
-                        str(context) + " found item",
+                        TreeContext(context, " found item"),
                     )
 
                 else:
                     logging.debug(
-                        "No value found for item "
-                        + str(data_model)
-                        + " at "
-                        + str(context),
+                        "No value found for item %s at %s", data_model, context
                     )
 
         return result
@@ -826,39 +985,39 @@ class TreeConverter:
             out_tree = result_tree
 
         if data_model is not None:
-            if isinstance(data_model, collections.abc.Mapping) and (
-                data_model.get("no_tag") is not None
-            ):
+            if is_map(data_model) and (data_model.get("no_tag") is not None):
                 logging.error(
-                    "Can't have 'no_tag' for 'find_list_apply_data_model' at "
-                    + str(context)
+                    "Can't have 'no_tag' for 'find_list_apply_data_model' at %s",
+                    context,
                 )
                 return
             else:
                 element_list = None
                 logging.debug(
-                    "Finding list of elements and applying data model at "
-                    + str(context),
+                    "Finding list of elements and applying data model at %s",
+                    context,
                 )
-                if isinstance(data_model, collections.abc.Mapping) and (
-                    data_model.get("tag") is not None
-                ):
-                    element_list = element_tree.findall(data_model["tag"], self.ns)
+                if is_map(data_model) and (data_model.get("tag") is not None):
+                    element_list = element_tree.findall(
+                        self.resolve_path(data_model["tag"]), self.ns
+                    )
                     logging.debug(
-                        "Applying data model to map tag " + str(data_model["tag"]),
+                        "Applying data model to map tag %s", data_model["tag"]
                     )
-                    context = context + ": " + data_model["tag"]
+                    context = TreeContext(context, ": ", data_model["tag"])
                 else:
-                    element_list = element_tree.findall(data_model, self.ns)
-                    logging.debug("Applying data model to item " + str(data_model))
-                    context = context + ": " + data_model
+                    element_list = element_tree.findall(
+                        self.resolve_path(data_model), self.ns
+                    )
+                    logging.debug("Applying data model to item %s", data_model)
+                    context = TreeContext(context, ": ", data_model)
                 if element_list is not None:
                     self.apply_data_model_to_list(
                         element_list,
                         data_model,
                         modifier,
                         out_tree,
-                        str(context) + " got element_list",
+                        TreeContext(context, " got element_list"),
                     )
 
         return out_tree
@@ -867,34 +1026,95 @@ class TreeConverter:
         self, element_tree, data_model, modifier, result_tree, context
     ):
         if result_tree is None:
-            logging.error("Missing definition for 'result_tree' in " + str(context))
+            logging.error("Missing definition for 'result_tree' in %s", context)
             return
 
-        if (data_model is not None) and isinstance(data_model, collections.abc.Mapping):
-            logging.debug("Applying map to element at " + str(context))
+        if (data_model is not None) and is_map(data_model):
+            logging.debug("Applying map to element at %s", context)
             self.apply_contains_to_element_for_result_tree(
                 element_tree,
                 data_model,
                 modifier,
                 result_tree,
-                str(context) + " apply_map",
+                TreeContext(context, " apply_map"),
             )
         else:
-            logging.error("Data model element is not a map at " + str(context))
+            logging.error("Data model element is not a map at %s", context)
             return
 
+    # Dispatch tables of the built-in functions, created once with the class
+    # rather than as bound methods for every instance
+    CONTAINS_DISPATCH_MAP = {
+        "attr": find_item_use_attrs_from_data_model,
+        "item": find_item_apply_data_model,
+        "list": find_list_apply_data_model,
+    }
+
+    MODIFIER_MAP = {
+        "key-value": map_to_key_value,
+        "list-up-map": list_up_map,
+        "pull-single": pull_single_from_list,
+        "remove-list": remove_list,
+        "remove-zero": remove_zero,
+        "to-lower": to_lower,
+    }
+
 
 class HugoConverter:
+    __slots__ = (
+        "config",
+        "wpxr_tree",
+        "site_url",
+        "site_parsed",
+        "image_origin_prefix_len",
+        "image_origin_abs_url",
+        "site_href_re",
+        "author_display_names",
+        "hugo_config",
+        "content_map",
+        "hugo_items",
+        "contents_checked",
+        "replacements",
+        "page_map",
+        "parent_path_cache",
+        "draft_cache",
+        "image_paths",
+        "original_image_urls",
+        "modifier_map",
+        "tree_converter",
+        "use_author_display_name_in_metadata",
+        "fields_value_replace",
+        "compiled_fields_value_replace",
+        "rename_fields",
+        "field_filter",
+        "remove_field_values",
+        "remove_field_value_sets",
+        "content_html_parser",
+        "content_hrefs_use_html_parser",
+        "image_origin",
+        "image_rel_url",
+        "image_rel_base",
+        "hugo_wp_items",
+        "hugo_project_config",
+    )
+
     def __init__(self, config, wpxr_tree):
         self.config = config
         self.wpxr_tree = wpxr_tree
         self.site_url = None
+        self.site_parsed = None
+        self.image_origin_prefix_len = None
+        self.image_origin_abs_url = None
+        self.site_href_re = None
+        self.author_display_names = None
         self.hugo_config = None
         self.content_map = {}
         self.hugo_items = None
         self.contents_checked = 0
         self.replacements = 0
         self.page_map = None
+        self.parent_path_cache = {}
+        self.draft_cache = {}
         self.image_paths = []
         self.original_image_urls = []
 
@@ -922,6 +1142,19 @@ class HugoConverter:
             self.config.get_config_item("fields_value_replace") or {}
         )
 
+        # Compile the patterns once, rather than for every field value
+        self.compiled_fields_value_replace = {}
+        if is_map(self.fields_value_replace):
+            for field_name, field_replace_items in self.fields_value_replace.items():
+                if (field_replace_items is not None) and is_map(field_replace_items):
+                    self.compiled_fields_value_replace[field_name] = [
+                        (
+                            re.compile(target, flags=re.MULTILINE | re.DOTALL),
+                            replacement,
+                        )
+                        for target, replacement in field_replace_items.items()
+                    ]
+
         # Renaming fields
         self.rename_fields = self.config.get_config_item("rename_fields") or []
 
@@ -931,23 +1164,54 @@ class HugoConverter:
             self.config.get_config_item("remove_field_values") or []
         )
 
+        # Values to remove, grouped per field into a set of the hashable
+        # values and a list of any others (e.g. lists or maps)
+        self.remove_field_value_sets = {}
+        if isinstance(self.remove_field_values, list):
+            for fields_values in self.remove_field_values:
+                if (fields_values is not None) and is_map(fields_values):
+                    for field, field_value in fields_values.items():
+                        hashable_values, unhashable_values = (
+                            self.remove_field_value_sets.setdefault(field, (set(), []))
+                        )
+                        try:
+                            hashable_values.add(field_value)
+                        except TypeError:
+                            unhashable_values.append(field_value)
+
+        # HTML parser for content
+        self.content_html_parser = (
+            self.config.get_config_item("content_html_parser") or "html5lib"
+        )
+        if self.content_html_parser not in ["html5lib", "lxml"]:
+            raise ValueError(
+                "Invalid content_html_parser " + str(self.content_html_parser)
+            )
+        # Rewrite content hrefs by parsing the content as HTML, rather than
+        # with a regexp on the raw content
+        self.content_hrefs_use_html_parser = (
+            self.config.get_config_item("content_hrefs_use_html_parser") or False
+        )
+        if (self.content_html_parser == "lxml") and (lxml_html is None):
+            logging.warning("lxml is not installed, using html5lib to parse content")
+            self.content_html_parser = "html5lib"
+
         # Image URL/Path configuration
         self.image_origin = self.config.get_config_item("image_origin_rel_url") or ""
         self.image_rel_url = self.config.get_config_item("image_rel_url") or "/images"
+        # What urljoin makes of image_rel_url as a base, so it can be used
+        # as a plain prefix
+        self.image_rel_base = urljoin(self.image_rel_url + "/", "x")[:-1]
 
         # Data Models
         self.hugo_wp_items = config.get_data_model_item("hugo_wp_items")
 
-        if (self.hugo_wp_items is None) or (
-            not isinstance(self.hugo_wp_items, collections.abc.Mapping)
-        ):
+        if (self.hugo_wp_items is None) or (not is_map(self.hugo_wp_items)):
             raise ImportError("Invalid data_model for 'hugo_wp_items'")
 
         self.hugo_project_config = config.get_data_model_item("hugo_project_config")
 
-        if (self.hugo_project_config is None) or (
-            not isinstance(self.hugo_project_config, collections.abc.Mapping)
-        ):
+        if (self.hugo_project_config is None) or (not is_map(self.hugo_project_config)):
             raise ImportError(
                 "Invalid definition of " + "'hugo_project_config' in config file"
             )
@@ -1002,9 +1266,8 @@ class HugoConverter:
     def make_url_relative(self, item_url, result_tree, item_map, item_name, context):
         if item_url is not None:
             item_parsed = urlparse(item_url)
-            if self.site_url is not None:
-                site_parsed = urlparse(self.site_url)
-                if item_parsed.netloc == site_parsed.netloc:
+            if self.site_parsed is not None:
+                if item_parsed.netloc == self.site_parsed.netloc:
                     item_parsed = item_parsed._replace(scheme="", netloc="")
             else:
                 item_parsed = item_parsed._replace(scheme="", netloc="")
@@ -1013,75 +1276,92 @@ class HugoConverter:
             return item_url
 
     def replace_value_in_fields(self, item, result_tree, item_map, item_name, context):
-        newcontent = str(item)
-        if (
-            (self.fields_value_replace is not None)
-            and isinstance(self.fields_value_replace, collections.abc.Mapping)
-            and (self.fields_value_replace.get(item_name) is not None)
-            and isinstance(
-                self.fields_value_replace[item_name], collections.abc.Mapping
-            )
-        ):
-            field_replace_items = self.fields_value_replace[item_name]
+        newcontent = as_str(item)
+        field_replace_items = self.compiled_fields_value_replace.get(item_name)
+        if field_replace_items is not None:
             if item_name == "content":
                 self.contents_checked = self.contents_checked + 1
-            for target, replacement in field_replace_items.items():
-                newcontent = re.sub(
-                    target, replacement, newcontent, flags=re.MULTILINE | re.DOTALL
-                )
+            for target, replacement in field_replace_items:
+                newcontent = target.sub(replacement, newcontent)
                 if (item != newcontent) and (item_name == "content"):
                     self.replacements = self.replacements + 1
                 item = newcontent
 
         return newcontent
 
+    # Parse HTML content to an (ElementTree API) tree with a 'div' container
+    def parse_html_content(self, content):
+        if self.content_html_parser == "lxml":
+            return lxml_html.fragment_fromstring(content, create_parent="div")
+        from html5lib import parseFragment as html5lib_parse
+
+        return html5lib_parse(content, container="div", namespaceHTMLElements=False)
+
+    def serialize_html_content(self, html_content):
+        if self.content_html_parser == "lxml":
+            # Only the contents of the container, not the container itself
+            return html.escape(html_content.text or "", quote=False) + "".join(
+                lxml_tostring(child, method="html", encoding="unicode")
+                for child in html_content
+            )
+        from html5lib import serialize as html5lib_serialize
+
+        return html5lib_serialize(
+            html_content,
+            omit_optional_tags=False,
+            minimize_boolean_attributes=False,
+            use_trailing_solidus=True,
+        )
+
     def handle_image_urls_in_html_content(
         self, content, result_tree, item_map, item_name, context
     ):
-        newcontent = str(content)
-        html5_content = html5lib_parse(
-            newcontent, container="div", namespaceHTMLElements=False
-        )
-        if html5_content is not None:
-            elements_src_update = []
+        newcontent = as_str(content)
+        # Avoid parsing (and serializing) content which has no figures
+        if FIGURE_TAG_RE.search(newcontent) is None:
+            return newcontent
+
+        html_content = self.parse_html_content(newcontent)
+        if html_content is not None:
+            changed = False
             gotFigure = False
-            for element in html5_content.iter():
+            for element in html_content.iter():
                 if element.tag == "figure":
                     gotFigure = True
                 elif element.tag == "img" and (gotFigure is True):
                     src = element.get("src")
                     if src is not None:
                         orig_src = src
-                        parsed_src = urlparse(src)
-                        parsed_site_url = urlparse(self.site_url)
                         new_src = src
-                        if parsed_src.netloc == parsed_site_url.netloc:
+                        # Almost all local images are under the image origin,
+                        # which a prefix test finds without parsing the URL
+                        if (self.image_origin_abs_url is not None) and src.startswith(
+                            self.image_origin_abs_url
+                        ):
+                            new_src = src[self.image_origin_prefix_len :]
+                        elif urlparse(src).netloc == self.site_parsed.netloc:
                             # Strip the absolute origin and unwanted original path
-                            new_src = src[
-                                (len(urljoin(self.site_url, self.image_origin)) + 1) :
-                            ]
+                            new_src = src[self.image_origin_prefix_len :]
                         # We did find a local URL
                         if src != new_src:
                             self.original_image_urls.append(orig_src)
                             self.image_paths.append(new_src)
-                            new_src = urljoin(self.image_rel_url + "/", new_src)
-                            elements_src_update.append(
-                                {"element": element, "src": new_src}
-                            )
+                            # A plain relative path can just be appended to
+                            # the (already resolved) image_rel_url
+                            if PLAIN_REL_PATH_RE.fullmatch(new_src) is not None:
+                                new_src = self.image_rel_base + new_src
+                            else:
+                                new_src = urljoin(self.image_rel_url + "/", new_src)
+                            # Changing an attribute doesn't disturb iter()
+                            element.set("src", new_src)
+                            changed = True
                     gotFigure = False
                 elif gotFigure is True:
                     gotFigure = False
 
             # Only rewrite content if we made one or more changes
-            if len(elements_src_update) > 0:
-                for element_src in elements_src_update:
-                    element_src["element"].set("src", element_src["src"])
-                newcontent = html5lib_serialize(
-                    html5_content,
-                    omit_optional_tags=False,
-                    minimize_boolean_attributes=False,
-                    use_trailing_solidus=True,
-                )
+            if changed:
+                newcontent = self.serialize_html_content(html_content)
 
         return newcontent
 
@@ -1089,62 +1369,92 @@ class HugoConverter:
     def make_href_relative_in_content(
         self, content, result_tree, item_map, item_name, context
     ):
-        newcontent = str(content)
-        html5_content = html5lib_parse(
-            newcontent, container="div", namespaceHTMLElements=False
-        )
-        if html5_content is not None:
-            elements_href_update = []
-            gotFigure = False
-            for element in html5_content.iter():
+        newcontent = as_str(content)
+        # Avoid parsing (and serializing) content which has no links
+        if ANCHOR_TAG_RE.search(newcontent) is None:
+            return newcontent
+
+        if not self.content_hrefs_use_html_parser:
+            if self.site_href_re is not None:
+                newcontent = self.site_href_re.sub(
+                    self.strip_site_from_href, newcontent
+                )
+            return newcontent
+
+        html_content = self.parse_html_content(newcontent)
+        if html_content is not None:
+            changed = False
+            for element in html_content.iter():
                 if element.tag == "a":
                     href = element.get("href")
                     if href is not None:
                         href_parsed = urlparse(href)
-                        if self.site_url is not None:
-                            site_parsed = urlparse(self.site_url)
-                            if href_parsed.netloc == site_parsed.netloc:
+                        if self.site_parsed is not None:
+                            if href_parsed.netloc == self.site_parsed.netloc:
                                 href_parsed = href_parsed._replace(scheme="", netloc="")
-                                elements_href_update.append(
-                                    {"element": element, "href": href_parsed.geturl()}
-                                )
-            if len(elements_href_update) > 0:
-                for element_href in elements_href_update:
-                    element_href["element"].set("href", element_href["href"])
-                newcontent = html5lib_serialize(
-                    html5_content,
-                    omit_optional_tags=False,
-                    minimize_boolean_attributes=False,
-                    use_trailing_solidus=True,
-                )
+                                element.set("href", href_parsed.geturl())
+                                changed = True
+            if changed:
+                newcontent = self.serialize_html_content(html_content)
         return newcontent
 
+    # Replacement for a site_href_re match; drops the scheme and host
+    def strip_site_from_href(self, match):
+        # An unquoted href that was only the site URL still needs a value
+        if (match.group(2) == "") and (
+            (match.group(3) in ["", ">"]) or match.group(3).isspace()
+        ):
+            return match.group(1) + '""'
+        return match.group(1)
+
     # Convert author to author_display_name, if requested
     def sub_author_display_name_for_login_name(
         self, author, result_tree, item_map, item_name, context
     ):
-        if self.use_author_display_name_in_metadata:
-            if (
-                (author is not None)
-                and (self.hugo_config["author"] is not None)
-                and isinstance(self.hugo_config["author"], collections.abc.Mapping)
-            ):
-                page_author = self.hugo_config["author"]
-                if (page_author.get("authors") is not None) and isinstance(
-                    page_author["authors"], list
-                ):
-                    p_author_list = page_author["authors"]
-                    for p_author in p_author_list:
-                        if (p_author.get("uid") == author) and (
-                            p_author.get("name") is not None
-                        ):
-                            author = p_author["name"]
+        if self.use_author_display_name_in_metadata and (author is not None):
+            if self.author_display_names is None:
+                self.build_author_display_names()
+            author = self.author_display_names.get(author, author)
         return author
 
+    # Map of author uid (login name) to display name, from the site config
+    def build_author_display_names(self):
+        self.author_display_names = {}
+        page_author = self.hugo_config.get("author")
+        if (page_author is not None) and is_map(page_author):
+            if (page_author.get("authors") is not None) and isinstance(
+                page_author["authors"], list
+            ):
+                for p_author in page_author["authors"]:
+                    if (
+                        (p_author is not None)
+                        and is_map(p_author)
+                        and (p_author.get("uid") is not None)
+                        and (p_author.get("name") is not None)
+                    ):
+                        # The first author with a uid wins, as before
+                        self.author_display_names.setdefault(
+                            p_author["uid"], p_author["name"]
+                        )
+
     # Convert WP GMT date to iso-8601 format
     def convert_from_wp_gmt_date(self, date, result_tree, item_map, item_name, context):
         outdate = date
-        olddate = datetime.datetime.strptime(str(date) + "Z", "%Y-%m-%d %H:%M:%S%z")
+        date_str = as_str(date)
+        # WP always writes 'YYYY-MM-DD HH:MM:SS', so slice the fields
+        # directly and only use strptime for anything else
+        if WP_GMT_DATE_RE.fullmatch(date_str) is not None:
+            olddate = datetime.datetime(
+                int(date_str[0:4]),
+                int(date_str[5:7]),
+                int(date_str[8:10]),
+                int(date_str[11:13]),
+                int(date_str[14:16]),
+                int(date_str[17:19]),
+                tzinfo=datetime.timezone.utc,
+            )
+        else:
+            olddate = datetime.datetime.strptime(date_str + "Z", WP_GMT_DATE_FORMAT)
         outdate = olddate.isoformat()
         return outdate
 
@@ -1153,6 +1463,8 @@ class HugoConverter:
     def convert_hugo_config(self):
         logging.info("Creating hugo config (e.g. toml file)")
         self.hugo_config = {}
+        # Display names are looked up from the authors in hugo_config
+        self.author_display_names = None
         self.tree_converter.for_map_apply_data_model(
             self.wpxr_tree.get_wpxr_tree(),
             self.hugo_project_config,
@@ -1170,6 +1482,26 @@ class HugoConverter:
         elif self.hugo_config.get("homepage") is not None:
             self.site_url = self.hugo_config["homepage"]
 
+        # Parse the base URL once, rather than for every URL in every item
+        if self.site_url is not None:
+            self.site_parsed = urlparse(self.site_url)
+            # Length of the absolute URL of WordPress images, including '/'
+            self.image_origin_prefix_len = (
+                len(urljoin(self.site_url, self.image_origin)) + 1
+            )
+            # Absolute URL prefix of WordPress images, if it is on this site
+            image_origin_abs_url = urljoin(self.site_url, self.image_origin) + "/"
+            if urlparse(image_origin_abs_url).netloc == self.site_parsed.netloc:
+                self.image_origin_abs_url = image_origin_abs_url
+            # The start of an <a> href (with any scheme, or none) for this site
+            if self.site_parsed.netloc:
+                self.site_href_re = re.compile(
+                    ANCHOR_HREF_START_PATTERN
+                    + r"(?:[A-Za-z][A-Za-z0-9+.-]*:)?//"
+                    + re.escape(self.site_parsed.netloc)
+                    + r"(?=([/?#\"'\s>]|$))"
+                )
+
         logging.info("Got baseURL of " + str(self.site_url))
 
     def convert_hugo_items(self):
@@ -1203,145 +1535,132 @@ class HugoConverter:
                 + " content section(s)."
             )
 
-    def page_map_add_parent(self, page_id, parent_id):
-        if self.page_map.get(parent_id) is None:
-            self.page_map[parent_id] = {"children": [page_id]}
-        else:
-            parents_children = self.page_map[parent_id].get("children")
-            if parents_children is not None:
-                if isinstance(parents_children, list):
-                    if page_id not in parents_children:
-                        parents_children.append(page_id)
-                else:
-                    raise TypeError(
-                        "Page with id "
-                        + str(parent_id)
-                        + " has non-list for "
-                        + "children id list"
-                    )
-            else:
-                self.page_map[parent_id]["children"] = [page_id]
-
+    # Get (or add a placeholder, until the page itself is seen) the page_map
+    # entry for a page; every entry has all the fields, so nothing using
+    # page_map needs to check for them
+    def page_map_entry(self, page_id):
+        page_entry = self.page_map.get(page_id)
+        if page_entry is None:
+            page_entry = {
+                "children": [],
+                "page_index": None,
+                "parent": 0,
+                "slug": None,
+                "wp_status": None,
+            }
+            self.page_map[page_id] = page_entry
+        return page_entry
+
+    # Pages share ancestors, so each page's parent path and draft status is
+    # computed once from its parent's (cached) result, rather than walking
+    # the whole ancestry again for every page
     def page_map_get_parent_path(self, page_id):
-        cur_id = page_id
-        slug_list = []
-        parent_path = ""
-        # Find top of this page's ancestry
-        cur_id = self.page_map[cur_id].get("parent")
-        while (
-            ((cur_id is not None) and self.page_map.get(cur_id) is not None)
-            and cur_id != 0
-            and (self.page_map[cur_id].get("slug") is not None)
-        ):
-            slug_list.append(self.page_map[cur_id]["slug"])
-            cur_id = self.page_map[cur_id]["parent"]
+        parent_path = self.parent_path_cache.get(page_id)
+        if parent_path is not None:
+            return parent_path
 
-        if len(slug_list) > 0:
-            reversed_slug_list = reversed(slug_list)
-            parent_path = os.path.join(*reversed_slug_list)
+        parent_path = ""
+        parent_id = self.page_map[page_id]["parent"]
+        parent = self.page_map.get(parent_id) if parent_id else None
+        if (parent is not None) and (parent["slug"] is not None):
+            # Hugo paths always use '/', so there's no need for os.path.join
+            grandparent_path = self.page_map_get_parent_path(parent_id)
+            if grandparent_path:
+                parent_path = grandparent_path + "/" + parent["slug"]
+            else:
+                parent_path = parent["slug"]
 
+        self.parent_path_cache[page_id] = parent_path
         return parent_path
 
     def page_map_get_draft_status(self, page_id):
-        cur_id = page_id
-        draft_list = [self.page_map[cur_id].get("wp_status")]
-        # Find top of this page's ancestry
-        cur_id = self.page_map[cur_id].get("parent")
-        while (
-            (cur_id is not None) and self.page_map.get(cur_id) is not None
-        ) and cur_id != 0:
-            draft_list.append(self.page_map[cur_id].get("wp_status"))
-            cur_id = self.page_map[cur_id]["parent"]
-
-        draft = True
+        draft = self.draft_cache.get(page_id)
+        if draft is not None:
+            return draft
+
+        # Pages at the top of the hierarchy 'inherit' draft status
         last_draft = True
-        if len(draft_list) > 0:
-            reversed_draft_list = reversed(draft_list)
-            for draft_status in reversed_draft_list:
-                if draft_status == "publish":
-                    draft = False
-                elif draft_status == "inherit":
-                    draft = last_draft
-                else:
-                    draft = True
-                last_draft = draft
+        parent_id = self.page_map[page_id]["parent"]
+        if parent_id and (parent_id in self.page_map):
+            last_draft = self.page_map_get_draft_status(parent_id)
+
+        draft_status = self.page_map[page_id].get("wp_status")
+        if draft_status == "publish":
+            draft = False
+        elif draft_status == "inherit":
+            draft = last_draft
+        else:
+            draft = True
 
+        self.draft_cache[page_id] = draft
         return draft
 
     def build_page_map(self):
         self.page_map = {}
+        self.parent_path_cache = {}
+        self.draft_cache = {}
+
+        page_children = set()
 
         # For items of type 'page' determine the parents and path
-        for item in self.hugo_items:
+        for page_index, item in enumerate(self.hugo_items):
             if (item.get("type") is not None) and item["type"] in [
                 "page",
                 "post",
                 "posts",
             ]:
                 page_id = item["wp_id"]
-                page_index = self.hugo_items.index(item)
-                wp_status = item.get("wp_status")
-                if self.page_map.get(page_id) is None:
-                    if item.get("parent"):
-                        parent_id = item["parent"]
-                    else:
-                        parent_id = 0
-                    self.page_map[page_id] = {
-                        "children": [],
-                        "page_index": page_index,
-                        "parent": parent_id,
-                        "slug": item["slug"],
-                        "wp_status": wp_status,
-                    }
-                    self.page_map_add_parent(page_id, parent_id)
-                else:
-                    self.page_map[page_id]["page_index"] = page_index
-                    self.page_map[page_id]["slug"] = item["slug"]
-                    self.page_map[page_id]["wp_status"] = wp_status
-                    if item.get("parent"):
-                        parent_id = item["parent"]
-                    else:
-                        parent_id = 0
-                    self.page_map[page_id]["parent"] = parent_id
-                    self.page_map_add_parent(page_id, parent_id)
-
-        for page_id in self.page_map.keys():
-            self.page_map[page_id]["parent-path"] = self.page_map_get_parent_path(
-                page_id
-            )
+                parent_id = item.get("parent") or 0
+                page_entry = self.page_map_entry(page_id)
+                page_entry["page_index"] = page_index
+                page_entry["parent"] = parent_id
+                page_entry["slug"] = item["slug"]
+                page_entry["wp_status"] = item.get("wp_status")
+                # Most pages share a parent (0, for top level pages), so
+                # check for duplicates with a set, not the children list
+                if (parent_id, page_id) not in page_children:
+                    page_children.add((parent_id, page_id))
+                    self.page_map_entry(parent_id)["children"].append(page_id)
+
+        for page_id, page_entry in self.page_map.items():
+            page_entry["parent-path"] = self.page_map_get_parent_path(page_id)
 
     def mangle_hugo(self):
         content_count = 0
-        items_found_content = []
 
-        # Pull out content into a separate tree
-        for item in self.hugo_items:
+        if self.page_map is None:
+            self.page_map = self.get_page_map()
+
+        # Pages whose wp_status gets replaced with draft: true or draft: false,
+        # by index into hugo_items
+        draft_page_ids = {}
+        for page_id, page_entry in self.page_map.items():
+            page_index = page_entry.get("page_index")
+            if page_index:
+                draft_page_ids[page_index] = page_id
+
+        keys_to_rename = self.rename_fields
+        if (keys_to_rename is None) or (not is_map(keys_to_rename)):
+            keys_to_rename = None
+
+        # Do all the per-item changes in a single pass over the items
+        for item_index, item in enumerate(self.hugo_items):
+            # Pull out content into a separate tree
             if (item.get("content") is not None) and (item.get("wp_id") is not None):
                 content_count = content_count + 1
                 current_content = item.get("content")
-                items_found_content.append(item)
-                content = ""
                 if isinstance(current_content, list):
-                    for content_item in current_content:
-                        content = str(content) + str(content_item)
+                    content = "".join(
+                        str(content_item) for content_item in current_content
+                    )
                 else:
                     content = current_content
                 self.content_map[item["wp_id"]] = content
+                del item["content"]
 
-        for item in items_found_content:
-            del item["content"]
-
-        if self.page_map is None:
-            self.page_map = self.get_page_map()
-
-        # Rename fields
-        keys_to_rename = self.rename_fields
-        if (keys_to_rename is not None) and isinstance(
-            keys_to_rename, collections.abc.Mapping
-        ):
-
-            for item in self.hugo_items:
-                if (item is None) or (not isinstance(item, collections.abc.Mapping)):
+            # Rename fields
+            if keys_to_rename is not None:
+                if (item is None) or (not is_map(item)):
                     logging.error(
                         "item is not a map for rename_keys at " + item["wp_id"]
                     )
@@ -1357,42 +1676,130 @@ class HugoConverter:
                 for rename_key in renamed_keys:
                     del item[rename_key]
 
-        # Replace wp_status with draft: true or draft: false
-        for page_id in self.page_map.keys():
-            if self.page_map[page_id].get("page_index"):
-                self.hugo_items[self.page_map[page_id]["page_index"]][
-                    "draft"
-                ] = self.page_map_get_draft_status(page_id)
-                self.hugo_items[self.page_map[page_id]["page_index"]].pop("wp_status")
+            # Replace wp_status with draft: true or draft: false
+            page_id = draft_page_ids.get(item_index)
+            if page_id is not None:
+                item["draft"] = self.page_map_get_draft_status(page_id)
+                item.pop("wp_status", None)
 
-        # Remove unwanted values from fields (and field if empty)
-        for item in self.hugo_items:
-            if (self.remove_field_values is not None) and isinstance(
-                self.remove_field_values, list
-            ):
-                for fields_values in self.remove_field_values:
-                    if (fields_values is not None) and isinstance(
-                        fields_values, collections.abc.Mapping
-                    ):
-                        remove_fields = []
-                        for field, field_value in fields_values.items():
-                            if item.get(field) is not None:
-                                remove_values = []
-                                if isinstance(item[field], list):
-                                    if field_value in item[field]:
-                                        remove_values.append(field_value)
-                                    if len(item[field]) == len(remove_values):
-                                        remove_fields.append(field)
-                                elif item[field] == field_value:
-                                    remove_fields.append(field)
-                                if field not in remove_fields:
-                                    for remove_value in remove_values:
-                                        item[field].remove(remove_value)
-                        for remove_field in remove_fields:
-                            del item[remove_field]
+            # Remove unwanted values from fields (and field if empty)
+            for field, remove_values in self.remove_field_value_sets.items():
+                field_value = item.get(field)
+                if field_value is None:
+                    continue
+                if isinstance(field_value, list):
+                    # One pass over the list, rather than a scan and a
+                    # remove() for each value
+                    kept_values = [
+                        value
+                        for value in field_value
+                        if not is_remove_field_value(value, remove_values)
+                    ]
+                    if len(kept_values) < 1:
+                        del item[field]
+                    elif len(kept_values) < len(field_value):
+                        item[field] = kept_values
+                elif is_remove_field_value(field_value, remove_values):
+                    del item[field]
+
+
+# Markdown for content already converted (in this process), keyed by the
+# markdownify options and the content; revisions and translations often
+# repeat a post's content
+_MARKDOWN_CACHE = {}
+
+# markdownify (and BeautifulSoup with it) is only imported once there are
+# items to write, and then only once per process
+_MARKDOWNIFY = None
+
+
+def get_markdownify():
+    global _MARKDOWNIFY
+    if _MARKDOWNIFY is None:
+        from markdownify import markdownify
+
+        _MARKDOWNIFY = markdownify
+    return _MARKDOWNIFY
+
+
+# Write one item's file (front matter, then the content as markdown); this is
+# a module function so it can be run in a worker process
+def write_item_file(item_file, markdownify_options, markdownify_options_key):
+    item_full_path, front_matter, content, has_wp_id = item_file
+    # Build the whole file in memory and write it in one go
+    item_text = [front_matter, "---\n"]
+    if has_wp_id:
+        if content is not None:
+            cache_key = (markdownify_options_key, content)
+            parsed_content = _MARKDOWN_CACHE.get(cache_key)
+            if parsed_content is None:
+                parsed_content = get_markdownify()(content, **markdownify_options)
+                _MARKDOWN_CACHE[cache_key] = parsed_content
+            item_text.append(parsed_content)
+        item_text.append("\n")
+    with open(item_full_path, "w", encoding="utf-8") as out_file:
+        out_file.write("".join(item_text))
+
+
+# One connection pool for all downloads, so connections (and TLS sessions)
+# to the site are kept alive and reused
+_HTTP_POOL = None
+
+
+def get_http_pool():
+    global _HTTP_POOL
+    if _HTTP_POOL is None:
+        _HTTP_POOL = PoolManager(
+            num_pools=4,
+            maxsize=HugoWriter.DOWNLOAD_WORKERS,
+            block=False,
+            headers={"Connection": "keep-alive"},
+        )
+    return _HTTP_POOL
 
 
 class HugoWriter:
+    __slots__ = (
+        "config",
+        "site_url",
+        "hugo_config",
+        "hugo_items",
+        "content_map",
+        "image_paths",
+        "original_image_urls",
+        "build_dir",
+        "content_dir",
+        "target_extension",
+        "markdownify_options",
+        "item_type_filter",
+        "item_field_filter",
+        "item_field_list_filter",
+        "final_remove_fields",
+        "regexp_remove_fields",
+        "compiled_regexp_remove_fields",
+        "no_output_wp_id",
+        "download_content_images",
+        "image_origin_rel_url",
+        "image_local_path",
+        "image_destination_path",
+        "remove_permalink_alias",
+        "page_map",
+        "base_dir",
+        "site_content_dir",
+        "full_dir_cache",
+    )
+
+    # Concurrent image downloads; enough to hide latency, without being
+    # rate limited by the site
+    DOWNLOAD_WORKERS = 8
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+    # Items handed to each item writing process at a time
+    WRITE_CHUNK_SIZE = 32
+
+    # Concurrent image copies, to overlap the (mostly I/O) time per file
+    COPY_WORKERS = 16
+
     def __init__(
         self,
         config,
@@ -1423,7 +1830,9 @@ class HugoWriter:
         )
 
         # Filtering items (pages/posts etc)
-        self.item_type_filter = self.config.get_config_item("item_type_filter") or []
+        self.item_type_filter = (
+            self.config.get_config_item("item_type_filter") or frozenset()
+        )
 
         self.item_field_filter = self.config.get_config_item("item_field_filter") or {}
         self.item_field_list_filter = (
@@ -1432,13 +1841,37 @@ class HugoWriter:
 
         # Remove fields needed during processing but not wanted in output
         self.final_remove_fields = (
-            self.config.get_config_item("final_remove_fields") or []
+            self.config.get_config_item("final_remove_fields") or frozenset()
         )
 
         # Remove fields via regexp that are not wanted in output
         self.regexp_remove_fields = (
             self.config.get_config_item("regexp_remove_fields") or []
         )
+        self.compiled_regexp_remove_fields = []
+        if isinstance(self.regexp_remove_fields, list):
+            self.compiled_regexp_remove_fields = [
+                re.compile(field) for field in self.regexp_remove_fields
+            ]
+            # Where they can be, combine the patterns into one, so each key
+            # is only searched once (not with backreferences, as the group
+            # numbers would change)
+            if (len(self.compiled_regexp_remove_fields) > 1) and not any(
+                BACKREFERENCE_RE.search(field) is not None
+                for field in self.regexp_remove_fields
+            ):
+                try:
+                    self.compiled_regexp_remove_fields = [
+                        re.compile(
+                            "|".join(
+                                "(?:" + field + ")"
+                                for field in self.regexp_remove_fields
+                            )
+                        )
+                    ]
+                except re.error:
+                    # e.g. global flags, which have to be at the start
+                    pass
 
         # Don't output wp_id in metadata
         self.no_output_wp_id = self.config.get_config_item("no_output_wp_id") or False
@@ -1469,14 +1902,18 @@ class HugoWriter:
         # Page Map
         self.page_map = page_map
 
+        # Output paths (set when first needed)
+        self.base_dir = None
+        self.site_content_dir = None
+        self.full_dir_cache = {}
+
     # Determine base path of site
     def set_base_path(self):
         name = str(self.site_url)
-        name = re.sub("^https?", "", name)
-        name = re.sub("[^A-Za-z0-9_.-]", "", name)
+        name = URL_SCHEME_RE.sub("", name)
+        name = NAME_SANITIZE_RE.sub("", name)
         base_dir = os.path.normpath(self.build_dir + "/" + name)
-        if not os.path.exists(base_dir):
-            os.makedirs(base_dir)
+        os.makedirs(base_dir, exist_ok=True)
         self.base_dir = base_dir
 
     # Determine content path of site
@@ -1485,22 +1922,28 @@ class HugoWriter:
             self.set_base_path()
         base_dir = self.base_dir
         content_dir = os.path.join(base_dir, self.content_dir)
-        if not os.path.exists(content_dir):
-            os.makedirs(content_dir)
+        os.makedirs(content_dir, exist_ok=True)
         self.site_content_dir = content_dir
+        self.full_dir_cache = {}
 
     # Determine full path to dir
     # (and create if necessary) relative
     # to current working directory
     def get_full_dir(self, new_dir):
+        # Many items share a directory, so only check (and create) each once
+        full_dir = self.full_dir_cache.get(new_dir)
+        if full_dir is not None:
+            return full_dir
         if self.site_content_dir is None:
             self.set_content_path()
         full_dir = os.path.normpath(self.site_content_dir + "/" + new_dir)
-        if not os.path.exists(full_dir):
-            os.makedirs(full_dir)
+        os.makedirs(full_dir, exist_ok=True)
+        self.full_dir_cache[new_dir] = full_dir
         return full_dir
 
     def write_hugo_config_toml(self):
+        import toml
+
         logging.info("EMIT: config: config.toml")
 
         # Create the base output directory for the site
@@ -1508,13 +1951,10 @@ class HugoWriter:
 
         # Dump the config.toml data model to
         # an actual config.toml for the site
-        config_toml_file = codecs.open(
-            os.path.join(self.base_dir, "config.toml"),
-            "w",
-            encoding="utf-8",
-        )
-        toml.dump(self.hugo_config, config_toml_file)
-        config_toml_file.close()
+        with open(
+            os.path.join(self.base_dir, "config.toml"), "w", encoding="utf-8"
+        ) as config_toml_file:
+            toml.dump(self.hugo_config, config_toml_file)
 
     # Filter out files we don't want to emit
     def filter_items(self, item):
@@ -1540,6 +1980,9 @@ class HugoWriter:
         # Create the base output directory for the site
         self.set_content_path()
 
+        # (path, YAML front matter, HTML content, has wp_id) for each file
+        item_files = []
+
         logging.info("Processing found hugo_items")
         # Output the YaML metadata and content data
         # for the final output files for the pages and posts
@@ -1632,50 +2075,75 @@ class HugoWriter:
                     if aliases_remove == True:
                         del item["aliases"]
 
-                wp_id = item["wp_id"]
+                # The fields to output (not including wp_id, if so configured;
+                # the item itself keeps it, for the content)
                 if self.no_output_wp_id is True:
-                    del item["wp_id"]
+                    output_item = {
+                        key: value for key, value in item.items() if key != "wp_id"
+                    }
+                else:
+                    output_item = item
 
                 if (self.final_remove_fields is not None) and isinstance(
-                    self.final_remove_fields, list
-                ):
-                    remove_field_keys = []
-                    for field in self.final_remove_fields:
-                        if item.get(field) is not None:
-                            remove_field_keys.append(field)
-
-                    for remove_field in remove_field_keys:
-                        del item[remove_field]
-
-                if (self.regexp_remove_fields is not None) and isinstance(
-                    self.regexp_remove_fields, list
+                    self.final_remove_fields, frozenset
                 ):
-                    remove_field_keys = []
-                    item_keys = item.keys()
-                    for field in self.regexp_remove_fields:
-                        for item_key in item_keys:
-                            if re.search(field, item_key) is not None:
-                                remove_field_keys.append(item_key)
-                    for remove_field in remove_field_keys:
-                        del item[remove_field]
-
-                logging.debug("      full_path: " + str(item_full_path))
-                item_file = codecs.open(item_full_path, "w", encoding="utf-8")
-                yaml.dump(data=item, stream=item_file, explicit_start=True)
-
-                if self.no_output_wp_id is True:
-                    item["wp_id"] = wp_id
+                    for remove_field in self.final_remove_fields.intersection(
+                        output_item
+                    ):
+                        del output_item[remove_field]
+
+                if len(self.compiled_regexp_remove_fields) > 0:
+                    # A snapshot of the keys, so they can be deleted as we go
+                    for item_key in tuple(output_item.keys()):
+                        for field in self.compiled_regexp_remove_fields:
+                            if field.search(item_key) is not None:
+                                del output_item[item_key]
+                                break
+
+                logging.debug("      full_path: %s", item_full_path)
+                front_matter = yaml.dump(
+                    data=output_item, Dumper=_SafeDumper, explicit_start=True
+                )
 
-                item_file.write("---\n")
-                if item.get("wp_id") is not None:
+                has_wp_id = item.get("wp_id") is not None
+                content = None
+                if has_wp_id:
                     content = self.content_map.get(item["wp_id"])
-                    if content is not None:
-                        parsed_content = markdownify(
-                            content, **self.markdownify_options
-                        )
-                        item_file.write(parsed_content)
-                    item_file.write("\n")
-                item_file.close()
+                item_files.append((item_full_path, front_matter, content, has_wp_id))
+
+        # Converting the content to markdown is most of the work of writing
+        # the items, and each is independent, so unless there are only a
+        # few spread them over a pool of processes
+        write_item = partial(
+            write_item_file,
+            markdownify_options=self.markdownify_options,
+            markdownify_options_key=repr(self.markdownify_options),
+        )
+        # Items with the same path overwrote each other when written in order,
+        # so only write the last of them; this also means no two processes
+        # write the same file
+        item_files = list(
+            {item_file[0]: item_file for item_file in item_files}.values()
+        )
+        # Keep items with the same content together, so they are written by
+        # the same process and the content is only converted once
+        item_files.sort(key=lambda item_file: item_file[2] or "")
+        if len(item_files) > HugoWriter.WRITE_CHUNK_SIZE:
+            # Images may be downloading on other threads, so start the workers
+            # fresh rather than forking them (with whatever locks those
+            # threads hold at the time)
+            with ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context("spawn")
+            ) as write_executor:
+                # list() so that any exception is raised here
+                list(
+                    write_executor.map(
+                        write_item, item_files, chunksize=HugoWriter.WRITE_CHUNK_SIZE
+                    )
+                )
+        else:
+            for item_file in item_files:
+                write_item(item_file)
 
     def download_images(self):
         if (
@@ -1685,70 +2153,106 @@ class HugoWriter:
             and (self.image_origin_rel_url is not None)
             and (self.image_local_path is not None)
         ):
-            http_pool = PoolManager()
-            if not os.path.exists(self.image_local_path):
-                os.makedirs(self.image_local_path)
-            for image_url in self.original_image_urls:
-                logging.info("Attempting to download " + str(image_url))
-                parsed_url = urlparse(image_url)
-                dest_rel_path = ""
-                parsed_site_url = urlparse(self.site_url)
-                # Only handle URLs from our site (local)
-                if parsed_url.netloc != parsed_site_url.netloc:
-                    logging.debug(
-                        parsed_site_url.netloc + " != " + parsed_site_url.netloc
-                    )
+            http_pool = get_http_pool()
+            os.makedirs(self.image_local_path, exist_ok=True)
+            # Work out the destinations (and create their directories, once
+            # each) first, then download concurrently, as the time taken is
+            # almost all waiting on the network
+            downloads = []
+            parsed_site_url = urlparse(self.site_url)
+            # Any URL starting with this passes both the site and base URL
+            # checks (the path always starts with '/', so the netloc can't
+            # continue past the prefix)
+            site_url_prefix = (
+                parsed_site_url.scheme
+                + "://"
+                + parsed_site_url.netloc
+                + (parsed_site_url.path or "/")
+            )
+            # Each image is listed once for every time it is used
+            for image_url in dict.fromkeys(self.original_image_urls):
+                dest_filename = self.get_image_download_path(
+                    image_url, parsed_site_url, site_url_prefix
+                )
+                if dest_filename is None:
                     continue
-                # Only handle URLs from our base URL
-                if not (parsed_url.path.startswith(parsed_site_url.path)):
-                    logging.debug(
-                        parsed_url.path + " does not start with " + parsed_site_url.path
-                    )
-
+                # Only download images we don't already have (an empty file
+                # is not a usable image)
+                if os.path.isfile(dest_filename) and (
+                    os.path.getsize(dest_filename) > 0
+                ):
+                    logging.debug("Skipping existing %s", dest_filename)
                     continue
-                dest_rel_path = parsed_url.path
-                if parsed_site_url.path != "/" and parsed_site_url.path != "":
-                    dest_rel_path = parsed_site_url.path[
-                        len(parsed_site_url.path) + 1 :
-                    ]
-                if dest_rel_path.startswith(self.image_origin_rel_url):
-                    dest_rel_path = dest_rel_path[len(self.image_origin_rel_url) + 1 :]
-                logging.debug(
-                    "Got final dest_rel_path of " + str(os.path.dirname(dest_rel_path))
-                )
-                dest_full_dir = os.path.normpath(
-                    self.image_local_path + "/" + os.path.dirname(dest_rel_path)
-                )
-                if not os.path.exists(dest_full_dir):
-                    os.makedirs(dest_full_dir)
-
-                dest_filename = os.path.normpath(
-                    dest_full_dir + "/" + os.path.basename(dest_rel_path)
+                downloads.append((image_url, dest_filename))
+            for dest_dir in set(
+                os.path.dirname(dest_filename) for _, dest_filename in downloads
+            ):
+                os.makedirs(dest_dir, exist_ok=True)
+            with ThreadPoolExecutor(
+                max_workers=HugoWriter.DOWNLOAD_WORKERS
+            ) as download_executor:
+                # list() so that any exception is raised here
+                list(
+                    download_executor.map(
+                        lambda download: self.download_image(http_pool, *download),
+                        downloads,
+                    )
                 )
 
-                logging.info(
-                    "Downloading " + str(image_url) + " -> " + str(dest_filename)
+    # Determine where to download an image on our site to, or None if it is
+    # not to be downloaded
+    def get_image_download_path(self, image_url, parsed_site_url, site_url_prefix):
+        logging.info("Attempting to download %s", image_url)
+        parsed_url = urlparse(image_url)
+        dest_rel_path = ""
+        # Nearly all images are from our site with the same scheme, so only
+        # compare the parts when the prefix doesn't match (e.g. http vs https)
+        if not image_url.startswith(site_url_prefix):
+            # Only handle URLs from our site (local)
+            if parsed_url.netloc != parsed_site_url.netloc:
+                logging.debug("%s != %s", parsed_url.netloc, parsed_site_url.netloc)
+                return None
+            # Only handle URLs from our base URL
+            if not (parsed_url.path.startswith(parsed_site_url.path)):
+                logging.debug(
+                    "%s does not start with %s", parsed_url.path, parsed_site_url.path
                 )
 
-                request = http_pool.request("GET", image_url, preload_content=False)
-                if request.status < 300:
-                    out_file = io.open(
-                        dest_filename,
-                        "wb",
-                    )
-
-                    for chunk in request.stream(1024):
-                        out_file.write(chunk)
-                    request.release_conn()
-                    out_file.close()
-                else:
-                    request.release_conn()
-                    logging.error(
-                        "Failed to download file "
-                        + str(image_url)
-                        + "; got HTTP Status "
-                        + str(request.status)
-                    )
+                return None
+        dest_rel_path = parsed_url.path
+        if parsed_site_url.path != "/" and parsed_site_url.path != "":
+            # Keep the leading '/' for comparison with image_origin_rel_url
+            dest_rel_path = parsed_url.path[len(parsed_site_url.path.rstrip("/")) :]
+        if dest_rel_path.startswith(self.image_origin_rel_url):
+            dest_rel_path = dest_rel_path[len(self.image_origin_rel_url) + 1 :]
+        dest_rel_dir = os.path.dirname(dest_rel_path)
+        logging.debug("Got final dest_rel_path of %s", dest_rel_dir)
+        dest_full_dir = os.path.normpath(self.image_local_path + "/" + dest_rel_dir)
+        # dest_full_dir is already normalized, and a basename has no '/'
+        dest_filename = os.path.join(dest_full_dir, os.path.basename(dest_rel_path))
+        return dest_filename
+
+    def download_image(self, http_pool, image_url, dest_filename):
+        logging.info("Downloading %s -> %s", image_url, dest_filename)
+
+        request = http_pool.request("GET", image_url, preload_content=False)
+        # Always give the connection back to the pool, to be reused
+        try:
+            if request.status < 300:
+                # Only complete downloads get the final name, so an existing
+                # image can be trusted on the next run
+                part_filename = dest_filename + ".part"
+                with io.open(part_filename, "wb") as out_file:
+                    copyfileobj(request, out_file, HugoWriter.DOWNLOAD_CHUNK_SIZE)
+                os.replace(part_filename, dest_filename)
+        finally:
+            request.release_conn()
+        if request.status >= 300:
+            logging.error(
+                "Failed to download file %s; got HTTP Status %s",
+                image_url,
+                request.status,
+            )
 
     def copy_images(self):
         if (
@@ -1757,25 +2261,33 @@ class HugoWriter:
             and (self.image_destination_path is not None)
             and (self.image_local_path is not None)
         ):
-            for image in self.image_paths:
-                if os.path.exists(
-                    os.path.normpath(self.image_local_path + "/" + image)
-                ):
-                    dest_path = os.path.normpath(
-                        self.base_dir + "/" + self.image_destination_path + "/" + image
-                    )
-                    dest_dir = os.path.dirname(dest_path)
-                    if not os.path.exists(dest_dir):
-                        os.makedirs(dest_dir)
-                    src_path = os.path.normpath(self.image_local_path + "/" + image)
-                    logging.info("Copying " + str(src_path) + " -> " + str(dest_path))
-                    copyfile(src_path, dest_path)
+            # Check the images (and create their directories, once each) in
+            # order, then copy them concurrently
+            copies = []
+            dest_base_path = self.base_dir + "/" + self.image_destination_path
+            for image in dict.fromkeys(self.image_paths):
+                # Image paths come from content, so still need normalizing
+                src_path = os.path.normpath(self.image_local_path + "/" + image)
+                if os.path.exists(src_path):
+                    dest_path = os.path.normpath(dest_base_path + "/" + image)
+                    copies.append((src_path, dest_path))
                 else:
-                    logging.error(
-                        "Image "
-                        + str(os.path.normpath(self.image_local_path + "/" + image))
-                        + " does not exist."
-                    )
+                    logging.error("Image %s does not exist.", src_path)
+            for dest_dir in set(os.path.dirname(dest_path) for _, dest_path in copies):
+                os.makedirs(dest_dir, exist_ok=True)
+            with ThreadPoolExecutor(
+                max_workers=HugoWriter.COPY_WORKERS
+            ) as copy_executor:
+                # list() so that any exception is raised here
+                list(copy_executor.map(lambda copy: self.copy_image(*copy), copies))
+
+    def copy_image(self, src_path, dest_path):
+        logging.info("Copying %s -> %s", src_path, dest_path)
+        copyfile(src_path, dest_path)
+
+
+# Default config files, in order of preference (only yaml and toml are read)
+CONFIG_FILE_CANDIDATES = ("config.yaml", "config.toml")
 
 
 # When this code is used as a command line program, it's configuration is entirely
@@ -1796,20 +2308,21 @@ def main():
     elif len(sys.argv) == 2:
         config_file_name = sys.argv[1]
 
-    config_files = None
+    # Otherwise the first of the config file names we can read that exists
     if config_file_name is None:
-        config_files = glob("config.*")
-    if (config_files is not None) and isinstance(config_files, list):
-        config_file_name = config_files[0]
-
-    config = W2SConfig(config_file_name)
+        for config_candidate in CONFIG_FILE_CANDIDATES:
+            if os.path.isfile(config_candidate):
+                config_file_name = config_candidate
+                break
 
-    if config is None:
+    if config_file_name is None:
         sys.stderr.write(
             "ERROR: Unable to find valid recognized config file (must be valid yaml or toml)\n"
         )
         sys.exit(1)
 
+    config = W2SConfig(config_file_name)
+
     # Setup logging (if any)
     loglevel = config.get_config_item("loglevel")
     if not isinstance(logging.getLevelName(loglevel), int):
@@ -1842,8 +2355,14 @@ def main():
             hugo_converter.get_original_image_urls(),
         )
         hugo_writer.write_hugo_config_toml()
-        hugo_writer.write_hugo_items()
-        hugo_writer.download_images()  # May be a noop
+        # Downloading is almost all waiting on the network, so do it while the
+        # items are written; the images must be local before they are copied
+        with ThreadPoolExecutor(max_workers=1) as download_executor:
+            # May be a noop
+            download_future = download_executor.submit(hugo_writer.download_images)
+            hugo_writer.write_hugo_items()
+            # result() so that any exception from downloading is raised here
+            download_future.result()
         hugo_writer.copy_images()  # May also be a noop
         logging.info("Writing complete for converted " + wpxr_file)
 